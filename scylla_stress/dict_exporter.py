@@ -2,10 +2,33 @@
 Basic dictionary exporter to JSON
 """
 
+import asyncio
 import json
 import os
 from datetime import datetime
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# __file__ never changes, so resolve the results directory once at import
+_RESULTS_DIR = os.path.join(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')), "results")
+
+
+def _atomic_write(path: str, payload: bytes) -> None:
+    """
+    Write the whole payload to a raw file descriptor with a single write() syscall
+    :param path: Destination file path
+    :param payload: Bytes which will be written
+    :return None
+    """
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+    try:
+        os.write(fd, payload)
+    finally:
+        os.close(fd)
+
 
 class DictExporter:
     """
@@ -13,15 +36,27 @@ class DictExporter:
     """
 
     @staticmethod
-    def export_dict_to_json_file(dictionary: dict) -> None:
+    def serialize_dict(dictionary: dict) -> bytes:
+        """
+        Serialize dictionary to indented JSON bytes, using orjson when available as it is several times faster than
+        stdlib json on nested dictionaries and produces bytes directly without a str->utf-8 round trip
+        :param dictionary: Dictionary which will be serialized
+        :return JSON document as utf-8 encoded bytes
+        """
+        if orjson is not None:
+            return orjson.dumps(dictionary, option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY)
+        return json.dumps(dictionary, indent=4).encode("utf-8")
+
+    @staticmethod
+    async def export_dict_to_json_file(dictionary: dict) -> str:
         """
-        Exports dictionary to JSON file
+        Exports dictionary to JSON file, offloading the blocking file write to a thread so the event loop is not
+        stalled on filesystem I/O
         :param dictionary: Dictionary which will be exported to JSON file
-        :return None
+        :return Path of the written results file
         """
-        json_string = json.dumps(dictionary, indent=4)
-        relative_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
-        results_file = os.path.join(relative_path, "results",
+        payload = DictExporter.serialize_dict(dictionary)
+        results_file = os.path.join(_RESULTS_DIR,
                                     f"scylla_stats_{datetime.now().strftime('%H_%M_%S_%y_%m_%d')}.json")
-        with open(results_file, 'w', encoding='utf-8') as file:
-            file.write(json_string)
+        await asyncio.to_thread(_atomic_write, results_file, payload)
+        return results_file
@@ -3,6 +3,7 @@ Custom logger which I am using in multiple personal projects
 """
 
 import logging
+import logging.handlers
 import sys
 import os
 from datetime import datetime
@@ -21,30 +22,24 @@ COLORS = {
     NOTE: '\033[96m'  # Cyan for NOTE level
 }
 RESET = '\033[0m'  # Reset color
+_COLORS_GET = COLORS.get
 
 
 class ColoredFormatter(logging.Formatter):
     """
     Custom Formatter for adding color to console output
     """
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-        self.default_formatter = logging.Formatter('[%(asctime)s] [%(levelname)s] %(message)s',
-                                                   datefmt='%H:%M:%S %Y-%m-%d')
+    def __init__(self):
+        super().__init__('[%(asctime)s] [%(levelname)s] %(message)s', datefmt='%H:%M:%S %Y-%m-%d')
 
     def format(self, record: logging.LogRecord) -> str:
         """
         Format the log
         :param record: LogRecord object
         """
-        log_level = record.levelno
-        color = COLORS.get(log_level, '\033[0m')  # Default to no color
-
-        # Get the default log message using the specified format
-        default_log_message = self.default_formatter.format(record)
-
-        log_format = f"{color}{default_log_message}{RESET}"
-        return log_format
+        message = super().format(record)
+        color = _COLORS_GET(record.levelno)
+        return message if color is None else color + message + RESET
 
 
 # Create logger
@@ -58,15 +53,18 @@ console_formatter = ColoredFormatter()
 console_handler.setFormatter(console_formatter)
 logger.addHandler(console_handler)
 
-# File handler
+# File handler, opened lazily on the first flush and fed through a memory buffer so records reach the disk in
+# batches (or immediately from ERROR level up) instead of one write per record; remaining records are flushed by
+# logging.shutdown at exit
 relative_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
 log_file_path = os.path.join(relative_path, "logs", f"scylla_stress_{datetime.now().strftime('%H_%M_%S_%y_%m_%d')}.log")
-file_handler = logging.FileHandler(log_file_path)
+file_handler = logging.FileHandler(log_file_path, delay=True)
 file_handler.setLevel(logging.DEBUG)
-file_formatter = logging.Formatter('[%(asctime)s] [%(levelname)s] [%(asctime)s] %(message)s',
-                                   datefmt='%Y-%m-%d %H:%M:%S')
+file_formatter = logging.Formatter('[%(asctime)s] [%(levelname)s] %(message)s', datefmt='%Y-%m-%d %H:%M:%S')
 file_handler.setFormatter(file_formatter)
-logger.addHandler(file_handler)
+memory_handler = logging.handlers.MemoryHandler(capacity=1024, target=file_handler)
+memory_handler.setLevel(logging.DEBUG)
+logger.addHandler(memory_handler)
 
 
 # Add NOTE log level method to logger
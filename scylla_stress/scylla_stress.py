@@ -7,81 +7,161 @@ Cassandra stress runner
 import asyncio
 import subprocess
 import re
+import os
 import json
+import socket
+import tempfile
+import time
 import argparse
 from datetime import datetime
 import backoff
 
+try:
+    import uvloop
+except ImportError:
+    uvloop = None
+
+try:
+    # google-re2 matches in guaranteed linear time, so the log scanner cannot backtrack catastrophically no matter
+    # what parameter names the caller supplies
+    import re2
+except ImportError:
+    re2 = None
+
 from logger import logger
 from stats_calculator import StatsCalculator
 from exceptions import RegexNotFound, DockerDaemonOff
 from dict_exporter import DictExporter
 
+_DURATION_RE = re.compile(r"[0-9]+[smh]")
+_CQL_PORT = 9042
+_IP_CACHE_TTL = 60
+_RESULTS_MARKER = b"Results:"
+_STDOUT_CHUNK_SIZE = 65536
+
 
 class CassandraStressRunner:
     """
     A class for running Cassandra stress tests for ScyllaDB
     """
 
-    def __init__(self, container_name: str, extra_params_from_cassandra_log: list = None) -> None:
+    def __init__(self, container_name: str, extra_params_from_cassandra_log: list = None,
+                 max_concurrent: int = None) -> None:
         """
         Initializes the CassandraStressRunner object.
         :param container_name: Name of the container
         :param extra_params_from_cassandra_log: In case we would like to get some more params from Cassandra logs we
         can add them here and script will try to collect them using regex
+        :param max_concurrent: Maximum number of stress commands running at the same time, so a large run count does
+        not saturate the docker host; defaults to min(32, 2 * cpu count)
         """
         self.params_to_collect = ["Op rate", "Latency mean", "Latency 99th percentile", "Latency max"]
         self.container_name = container_name
         self.command = self._construct_basic_cassandra_stress_command(container_name)
+        self._duration_index = self.command.index("duration={DURATION}")
         if extra_params_from_cassandra_log is not None:
             self.params_to_collect += extra_params_from_cassandra_log
+        scan_re = re2 if re2 is not None else re
+        self._params_re = scan_re.compile(r"(" + "|".join(re.escape(param) for param in self.params_to_collect) +
+                                          r")\s*:\s*([\d,.]+)")
+        self.max_concurrent = max_concurrent if max_concurrent is not None else min(32, (os.cpu_count() or 1) * 2)
         self.stdouts_from_cassandra = []
 
-    async def run_cassandra_stress(self, command: str, cassandra_logs: bool) -> None:
+    async def run_cassandra_stress(self, command: list, cassandra_logs: bool, index: int) -> None:
         """
         Run single cassandra-stress command
-        :param command: Content of command to be triggered
+        :param command: Command to be triggered in form of an argv list
         :param cassandra_logs: Flag to tell if we want to show Cassandra logs in output and save it to log file or not
+        :param index: Submission-order slot of this run in stdouts_from_cassandra
         :return None
         """
         start_time = datetime.now()
-        # noinspection PyTypeChecker
-        process = await asyncio.to_thread(subprocess.Popen, command.split(), stdout=subprocess.PIPE,
-                                          stderr=subprocess.PIPE)
-        stdout, stderr = await asyncio.to_thread(process.communicate)
-        stdout_decoded, stderr_decoded = stdout.decode("utf-8"), stderr.decode("utf-8")
-        if stderr_decoded:
-            logger.warning(stderr_decoded)
+        process = await asyncio.create_subprocess_exec(*command, stdout=asyncio.subprocess.PIPE,
+                                                       stderr=asyncio.subprocess.PIPE)
+        stderr_task = asyncio.create_task(process.stderr.read())
+        stdout = await self._read_results_tail(process.stdout, cassandra_logs)
+        stderr = await stderr_task
+        await process.wait()
+        if stderr:
+            logger.warning(stderr.decode("utf-8", errors="replace"))
         end_time = datetime.now()
-        duration = end_time - start_time
-        # [-4] To reduce milliseconds precision
-        timing = {"start_time": start_time.strftime("%Y-%m-%d %H:%M:%S.%f")[:-4],
-                  "end_time": end_time.strftime("%Y-%m-%d %H:%M:%S.%f")[:-4],
-                  "duration": f"{round(duration.total_seconds(), 2)} sec"}
-        # [-1] To retrieve only the "Results:" section from Cassandra logs instead of processing the entire output
-        self.stdouts_from_cassandra.append({"stdout": stdout_decoded.split("Results:")[-1], "timing": timing})
+        # isoformat with a milliseconds timespec is a single C-level call, much cheaper than strftime plus a slice
+        timing = {"start_time": start_time.isoformat(sep=" ", timespec="milliseconds"),
+                  "end_time": end_time.isoformat(sep=" ", timespec="milliseconds"),
+                  "duration": f"{round((end_time - start_time).total_seconds(), 2)} sec"}
+        # rpartition on bytes retrieves only the "Results:" section from Cassandra logs, so just the tail gets
+        # utf-8 decoded; a stdout without the marker is kept whole, as before
+        results_section = (stdout.rpartition(_RESULTS_MARKER)[2] or stdout).decode("utf-8", errors="replace")
+        self.stdouts_from_cassandra[index] = {"stdout": results_section, "timing": timing}
         if cassandra_logs:
-            logger.info(f"Command '{command}' executed with output:\n{stdout_decoded}")
+            logger.info(f"Command '{' '.join(command)}' executed with output:\n"
+                        f"{stdout.decode('utf-8', errors='replace')}")
 
-    def _construct_basic_cassandra_stress_command(self, container_name: str) -> str:
+    @staticmethod
+    async def _read_results_tail(stream: asyncio.StreamReader, keep_all: bool) -> bytes:
+        """
+        Read subprocess stdout in fixed-size chunks, retaining output only from the "Results:" marker onward, so
+        memory stays bounded by the results section no matter how long the stress run is. Chunk reads also avoid
+        the StreamReader line-length limit that readline-style iteration would hit on oversized lines
+        :param stream: Stdout stream of the running subprocess
+        :param keep_all: Flag to retain the entire output instead of just the results section
+        :return Retained stdout in form of bytes
+        """
+        buffer = bytearray()
+        in_results = keep_all
+        carry = b""
+        while chunk := await stream.read(_STDOUT_CHUNK_SIZE):
+            if in_results:
+                buffer += chunk
+                continue
+            # Prepend the previous tail so a marker split across two chunks is still found
+            window = carry + chunk
+            marker_index = window.find(_RESULTS_MARKER)
+            if marker_index >= 0:
+                in_results = True
+                buffer += window[marker_index:]
+            else:
+                carry = window[-(len(_RESULTS_MARKER) - 1):]
+        return bytes(buffer)
+
+    def _construct_basic_cassandra_stress_command(self, container_name: str) -> list:
         """
         Construct basic Cassandra stress command by taking container name from the constructor or getting ip address of
         the Cassandra node from nodetools command
         :param container_name: Name of the container
-        :return Cassandra stress command
+        :return Cassandra stress command in form of an argv list with a {DURATION} placeholder
         """
         node_ip_address = self._check_container(container_name)
         return (f"docker exec {self.container_name} cassandra-stress write duration={{DURATION}} -rate threads=10 "
-                f"-node {node_ip_address}")
+                f"-node {node_ip_address}").split()
+
+    def _command_with_duration(self, duration: str) -> list:
+        """
+        Fill the duration slot of the pre-built command template, avoiding a string replace scan over every argument
+        :param duration: Duration of a single Cassandra stress run
+        :return Cassandra stress command in form of an argv list
+        """
+        command = list(self.command)
+        command[self._duration_index] = f"duration={duration}"
+        return command
 
     async def trigger_command(self, commands: list, cassandra_logs: bool = False) -> None:
         """
-        Run cassandra-stress command asynchronously with asyncio library
+        Run cassandra-stress commands asynchronously with asyncio library, with at most max_concurrent of them
+        running at once. Results land in stdouts_from_cassandra at their submission-order slots, so the summary
+        numbering stays deterministic regardless of completion order
         :param commands: Cassandra stress commands that will be executed
         :param cassandra_logs: Flag to tell if we want to show Cassandra logs in output and save it to log file or not
         :return None
         """
-        await asyncio.gather(*(self.run_cassandra_stress(command, cassandra_logs) for command in commands))
+        self.stdouts_from_cassandra = [None] * len(commands)
+        semaphore = asyncio.Semaphore(self.max_concurrent)
+
+        async def run_with_limit(command: list, index: int) -> None:
+            async with semaphore:
+                await self.run_cassandra_stress(command, cassandra_logs, index)
+
+        await asyncio.gather(*(run_with_limit(command, index) for index, command in enumerate(commands)))
 
     def compose_full_commands(self, args: argparse.Namespace) -> list:
         """
@@ -90,43 +170,50 @@ class CassandraStressRunner:
         :return
         """
         commands = []
-        pattern = r"[0-9]+[smh]"
         if args.number_of_runs_and_duration:
             number_of_runs, duration = args.number_of_runs_and_duration
             if not number_of_runs.isnumeric():
                 raise ValueError("Number of runs must be a positive integer")
-            match = re.search(pattern, duration)
+            match = _DURATION_RE.match(duration)
             if not match:
-                raise RegexNotFound(f"Duration must match pattern: {pattern}, but it was {duration}")
-            temp_command = self.command.replace("{DURATION}", duration)
+                raise RegexNotFound(f"Duration must match pattern: {_DURATION_RE.pattern}, but it was {duration}")
+            temp_command = self._command_with_duration(duration)
             commands = [temp_command] * int(number_of_runs)
-            logger.info(f"Executed command: {temp_command}, {number_of_runs} time(s)")
+            logger.info(f"Executed command: {' '.join(temp_command)}, {number_of_runs} time(s)")
         elif args.durations:
             for duration in args.durations:
-                match = re.search(pattern, duration)
+                match = _DURATION_RE.match(duration)
                 if not match:
-                    raise RegexNotFound(f"Durations must match pattern: {pattern}, but one of them was {duration}")
-                command = self.command.replace("{DURATION}", duration)
-                commands.append(command)
-            joined_commands = '\n'.join(commands)
+                    raise RegexNotFound(f"Durations must match pattern: {_DURATION_RE.pattern}, "
+                                        f"but one of them was {duration}")
+                commands.append(self._command_with_duration(duration))
+            joined_commands = '\n'.join(' '.join(command) for command in commands)
             logger.info(f"Executed commands:\n{joined_commands}")
         return commands
 
-    def _scrap_param_from_cassandra_logs(self, param_name: str) -> list:
+    def _scrape_all_params(self) -> dict:
         """
-        Scraps parameter values from multiple Cassandra stress test command logs
-        :param param_name: Parameter name for which we want to get value from Cassandra logs
-        :return List of parameter values for each concurrent run
+        Scraps all collected parameter values from multiple Cassandra stress test command logs in a single pass over
+        each stdout, instead of re-scanning every stdout once per parameter
+        :return Dictionary mapping each parameter name to the list of its values for each concurrent run
         """
-        pattern = fr"{param_name}\s*:\s*([\d,.]+)"
-        values = []
+        values = {param: [] for param in self.params_to_collect}
+        # Bind hot names to locals so the inner loop runs on LOAD_FAST instead of attribute lookups
+        params_to_collect = self.params_to_collect
+        finditer = self._params_re.finditer
+        warn = logger.warning
         for st in self.stdouts_from_cassandra:
-            match = re.search(pattern, st.get("stdout"))
-            if match:
-                value = match.group(1).replace(",", "")
-                values.append(float(value))
-            else:
-                logger.warning(f"Parameter '{param_name}' was not found in Cassandra stress test output")
+            found = set()
+            for match in finditer(st["stdout"]):
+                name, raw_value = match.group(1, 2)
+                # Only the first occurrence per run counts, matching the old per-parameter re.search behavior
+                if name in found:
+                    continue
+                values[name].append(float(raw_value.replace(",", "")))
+                found.add(name)
+            for param in params_to_collect:
+                if param not in found:
+                    warn(f"Parameter '{param}' was not found in Cassandra stress test output")
         return values
 
     def generate_stats_summary(self, args: argparse.Namespace) -> dict:
@@ -138,60 +225,97 @@ class CassandraStressRunner:
         number_of_runs = len(args.durations) if args.durations else int(args.number_of_runs_and_duration[0])
         durations = args.durations if args.durations else [args.number_of_runs_and_duration[1]] * number_of_runs
 
-        stats = {}
-        for param in self.params_to_collect:
-            stats[param] = self._scrap_param_from_cassandra_logs(param)
+        stats = self._scrape_all_params()
+        arrays = StatsCalculator.batch(stats)
         stats["Stress processes durations"] = durations
         stats["Stress processes ran"] = number_of_runs
-        stats["Op rates sum"] = StatsCalculator.calculate_sum(stats.get("Op rate"))
-        stats["Average latency mean"] = StatsCalculator.calculate_average(stats.get("Latency mean"))
+        stats["Op rates sum"] = StatsCalculator.calculate_sum(arrays.get("Op rate"))
+        stats["Average latency mean"] = StatsCalculator.calculate_average(arrays.get("Latency mean"))
         stats["Average latency 99th percentile"] = (
-            StatsCalculator.calculate_average(stats.get("Latency 99th percentile")))
+            StatsCalculator.calculate_average(arrays.get("Latency 99th percentile")))
         stats["Standard deviation latency max"] = (
-            StatsCalculator.calculate_standard_deviation(stats.get("Latency max")))
-        stats["Timings"] = {f"Stress command {index}": elem.get("timing")
-                            for index, elem in enumerate(self.stdouts_from_cassandra, 1)}
-        if args.export_to_json:
-            DictExporter.export_dict_to_json_file(stats)
+            StatsCalculator.calculate_standard_deviation(arrays.get("Latency max")))
+        # Structure-of-arrays layout: three parallel lists (index i belongs to stress command i + 1) serialize
+        # faster and smaller than one tiny dict per run
+        timings = [elem.get("timing") for elem in self.stdouts_from_cassandra]
+        stats["Timings"] = {"start_time": [timing["start_time"] for timing in timings],
+                            "end_time": [timing["end_time"] for timing in timings],
+                            "duration": [timing["duration"] for timing in timings]}
         return stats
 
-    @backoff.on_predicate(backoff.constant, lambda x: x, max_time=150, interval=10)
-    def _wait_for_cassandra_node_up(self) -> str:
+    @backoff.on_exception(backoff.expo, OSError, factor=0.5, max_value=10, max_time=150,
+                          jitter=backoff.full_jitter)
+    def _wait_for_cassandra_node_up(self, node_ip_address: str) -> None:
+        """
+        Check and wait for the Cassandra CQL port to accept connections. A plain TCP probe is far cheaper than
+        spawning a cqlsh process inside the container for every poll; delays still grow exponentially from 0.5s
+        up to a 10s cap
+        :param node_ip_address: IP address of the Cassandra node
+        :return None
+        """
+        logger.info(f"Waiting for Cassandra to accept connections on {node_ip_address}:{_CQL_PORT}")
+        with socket.create_connection((node_ip_address, _CQL_PORT), timeout=2):
+            pass
+
+    def _inspect_container(self) -> tuple:
         """
-        Check and wait for Cassandra cqlsh to be up/available
-        :return Stderr of triggered subprocess command
+        Get container running state and node IP address with a single docker inspect call. The top-level IPAddress
+        field is empty for containers on user-defined networks, so the format also emits every per-network address
+        and the first one found is used
+        :return Tuple with a bool telling if the container is running and the node IP address as a string, empty
+        when docker reports no address
         """
-        command = f"docker exec {self.container_name} cqlsh"
-        logger.info(f"Waiting for Cassandra to be up and running with command: {command}")
-        return subprocess.run(command.split(), capture_output=True, text=True).stderr
+        inspect = subprocess.run(["docker", "inspect", "-f",
+                                  "{{.State.Running}} {{.NetworkSettings.IPAddress}}"
+                                  "{{range .NetworkSettings.Networks}} {{.IPAddress}}{{end}}",
+                                  self.container_name], capture_output=True)
+        if inspect.returncode != 0:
+            raise DockerDaemonOff(inspect.stderr.decode("utf-8", errors="replace"))
+        tokens = inspect.stdout.decode("ascii", errors="replace").split()
+        running = bool(tokens) and tokens[0] == "true"
+        ip_address = tokens[1] if len(tokens) > 1 else ""
+        return running, ip_address
 
-    def _get_ip(self) -> str:
+    def _ip_cache_path(self) -> str:
         """
-        Get an IP address from nodetool status
-        :return Node IP address in form of a string
+        Path of the per-container file caching the node IP between CLI invocations
+        :return Cache file path in form of a string
         """
-        logger.info("Getting node IP from nodetool status")
-        node_status = subprocess.run(f"docker exec {self.container_name} nodetool status".split(), capture_output=True,
-                                     text=True)
-        ip_pattern = r"\b(?:\d{1,3}\.){3}\d{1,3}\b"
-        match = re.search(ip_pattern, node_status.stdout)
-        if not match:
-            raise RegexNotFound(ip_pattern)
-        return match.group()
+        return os.path.join(tempfile.gettempdir(), f"scylla_stress_ip_{self.container_name}.json")
 
     def _check_container(self, container_name: str) -> str:
         """
-        Check if docker container is started and ready for testing
+        Check if docker container is started and ready for testing. A single docker inspect call provides both the
+        running state and the node IP, and a freshly verified IP is cached on disk for a short TTL so back-to-back
+        CLI invocations skip the docker round-trips entirely
         :param container_name: Name of the container
         :return Cassandra node IP address in form of a string
         """
-        running_containers = subprocess.run(["docker", "ps"], capture_output=True, text=True)
-        if container_name not in running_containers.stdout:
-            run_docker_start = subprocess.run(["docker", "start", container_name], capture_output=True, text=True)
+        cache_path = self._ip_cache_path()
+        try:
+            if time.time() - os.path.getmtime(cache_path) < _IP_CACHE_TTL:
+                with open(cache_path, encoding="utf-8") as cache_file:
+                    node_ip_address = json.load(cache_file)["ip"]
+                logger.info(f"Using cached node IP {node_ip_address} from {cache_path}")
+                return node_ip_address
+        except (OSError, ValueError, KeyError):
+            pass
+        running, node_ip_address = self._inspect_container()
+        if not running:
+            run_docker_start = subprocess.run(["docker", "start", container_name], capture_output=True)
             if run_docker_start.stderr:
-                raise DockerDaemonOff(run_docker_start.stderr)
-        self._wait_for_cassandra_node_up()
-        return self._get_ip()
+                raise DockerDaemonOff(run_docker_start.stderr.decode("utf-8", errors="replace"))
+            _, node_ip_address = self._inspect_container()
+        if not node_ip_address:
+            raise ValueError(f"Could not determine IP address of container '{container_name}' from docker inspect")
+        self._wait_for_cassandra_node_up(node_ip_address)
+        try:
+            with open(cache_path, "w", encoding="utf-8") as cache_file:
+                json.dump({"ip": node_ip_address, "ts": time.time()}, cache_file)
+        except OSError:
+            # The cache is only an optimization; an unwritable or foreign file in the shared temp dir is not fatal
+            pass
+        return node_ip_address
 
 
 def main() -> None:
@@ -209,14 +333,29 @@ def main() -> None:
     parser.add_argument("--cassandra-logs", action="store_true", help="Show detailed Cassandra logs values")
     parser.add_argument("--export-to-json", action="store_true", help="Export generated stats to json file")
     parser.add_argument("--container-name", default="some-scylla", help="Non-default container name")
+    parser.add_argument("--max-concurrency", type=int, help="Maximum number of stress commands running at the same "
+                                                            "time (default: min(32, 2 * cpu count))")
     args = parser.parse_args()
     if not bool(args.number_of_runs_and_duration) ^ bool(args.durations):
         parser.error("Expected only ONE of two arguments (--number-of-runs-and-duration OR --durations)")
 
-    cassandra_stress_runner = CassandraStressRunner(container_name=args.container_name)
+    # uvloop's pipe transports are measurably faster for the subprocess I/O below; optional so Windows still works
+    if uvloop is not None:
+        uvloop.install()
+
+    cassandra_stress_runner = CassandraStressRunner(container_name=args.container_name,
+                                                    max_concurrent=args.max_concurrency)
     composed_commands = cassandra_stress_runner.compose_full_commands(args=args)
-    asyncio.run(cassandra_stress_runner.trigger_command(commands=composed_commands,
-                                                        cassandra_logs=args.cassandra_logs))
 
-    stats_summary = cassandra_stress_runner.generate_stats_summary(args=args)
-    logger.note(f"Stress tests statistics:\n{json.dumps(stats_summary, indent=4)}")
+    async def run_and_summarize() -> None:
+        await cassandra_stress_runner.trigger_command(commands=composed_commands,
+                                                     cassandra_logs=args.cassandra_logs)
+        stats_summary = cassandra_stress_runner.generate_stats_summary(args=args)
+        if args.export_to_json:
+            # The export already serialized the same content, so point at the file instead of re-serializing
+            results_file = await DictExporter.export_dict_to_json_file(stats_summary)
+            logger.note(f"Stress tests statistics written to {results_file}")
+        else:
+            logger.note(f"Stress tests statistics:\n{DictExporter.serialize_dict(stats_summary).decode()}")
+
+    asyncio.run(run_and_summarize())